@@ -1,15 +1,23 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional, Dict, Any
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
+import orjson
+from bs4 import BeautifulSoup, SoupStrainer
+import lxml.etree
+import lxml.html
 import re
 from urllib.parse import urljoin, urlparse
 import logging
+import time
+from itertools import islice
 from pydantic import Field
 
 # --- Config ---
 REQUEST_TIMEOUT = 8
+MAX_BODY_BYTES = 2_000_000  # cap per-page reads; misbehaving pages can be tens of MB
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; ShopifyInsightsFetcher/1.0; +https://example.com/bot)"
 }
@@ -20,8 +28,17 @@ logger = logging.getLogger("shopify-fetcher")
 
 # --- Helper regex ---
 EMAIL_RE = re.compile(r"([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
-PHONE_RE = re.compile(r"((?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{2,4}\)?[-.\s]?)?\d{5,12})")
-SOCIAL_HOSTS = ["instagram.com", "facebook.com", "tiktok.com", "twitter.com", "youtube.com", "pinterest.com", "linkedin.com"]
+# deliberately simple/linear-time; digit-count is validated in python afterwards
+PHONE_RE = re.compile(r"\+?\d[\d\-.\s()]{7,20}\d")
+FAQ_CLASS_RE = re.compile("faq", re.I)
+# classifies a nav entry in one scan; lastgroup names the matched category
+NAV_RE = re.compile(r"(?P<contact>contact)|(?P<about>about)|(?P<track>track|order|tracking)|(?P<blog>blog|/blogs)", re.I)
+SOCIAL_RE = re.compile(r"(?:https?://)?(?:www\.)?(instagram|facebook|tiktok|twitter|youtube|pinterest|linkedin)\.com", re.I)
+
+# tags extract_faqs_from_page actually inspects
+FAQ_STRAINER = SoupStrainer(["details", "dl", "dt", "dd", "summary", "h2", "h3", "h4", "section", "div"])
+# text-bearing tags only; keeps inline <script>/<style> blobs out of the tree
+TEXT_STRAINER = SoupStrainer(["p", "li", "h1", "h2", "h3", "h4", "h5", "span", "div", "td", "dt", "dd", "summary"])
 
 # --- Pydantic models ---
 
@@ -53,68 +70,104 @@ class BrandContext(BaseModel):
     important_links: Dict[str, str] = {}
     raw_pages: Dict[str, str] = {}
 
+# --- Shared HTTP session (keep-alive / connection pooling) ---
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+def get_session() -> aiohttp.ClientSession:
+    # created lazily so it binds to the running event loop; reused across
+    # requests so repeat hits to the same host skip TCP+TLS handshakes
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=32, limit_per_host=32),
+        )
+    return _SESSION
+
 # --- Utility functions ---
-def safe_get(url):
+async def safe_get(session: aiohttp.ClientSession, url: str) -> str:
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        return resp
-    except requests.HTTPError as e:
+        async with session.get(url) as resp:
+            resp.raise_for_status()
+            # StreamReader.read(n) returns whatever is buffered, not n bytes;
+            # accumulate chunks until the cap or EOF so multi-chunk bodies survive
+            chunks = []
+            total = 0
+            while total < MAX_BODY_BYTES:
+                chunk = await resp.content.readany()
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                total += len(chunk)
+            body = b"".join(chunks)[:MAX_BODY_BYTES]
+            return body.decode(resp.charset or "utf-8", errors="replace")
+    except aiohttp.ClientResponseError as e:
         logger.warning(f"HTTP error for {url}: {e}")
         raise
     except Exception as e:
         logger.warning(f"Request failed for {url}: {e}")
         raise
 
+async def url_exists(session: aiohttp.ClientSession, url: str) -> bool:
+    # HEAD is enough for an existence probe; the body gets fetched later if needed
+    try:
+        async with session.head(url, allow_redirects=True) as resp:
+            return resp.status == 200
+    except Exception:
+        return False
+
 def normalize_base(url: str) -> str:
     parsed = urlparse(url)
     base = f"{parsed.scheme}://{parsed.netloc}"
     return base
 
-def find_social_links(soup: BeautifulSoup, base: str):
-    found = {}
-    for a in soup.find_all("a", href=True):
-        href = a["href"].strip()
-        for host in SOCIAL_HOSTS:
-            if host in href:
-                # key = host shortened
-                key = host.split(".")[0]
-                # avoid duplicates
-                if key not in found:
-                    found[key] = href if href.startswith("http") else urljoin(base, href)
-    return found
+def _digits_ok(candidate: str) -> bool:
+    return 7 <= sum(c.isdigit() for c in candidate) <= 15
 
 def find_emails_phones(text: str):
-    emails = list(set(EMAIL_RE.findall(text)))
-    phones = list(set([p for p in PHONE_RE.findall(text) if len(re.sub(r"\D","",p))>=6]))
+    # finditer keeps this lazy; dedupe happens in the set as matches stream in
+    # returns sets so callers can union results from several pages cheaply
+    emails = {m.group(0) for m in EMAIL_RE.finditer(text)}
+    phones = {m.group(0) for m in PHONE_RE.finditer(text) if _digits_ok(m.group(0))}
     return emails, phones
 
-def extract_text_from_url(url: str) -> str:
-    try:
-        r = safe_get(url)
-        soup = BeautifulSoup(r.text, "lxml")
-        # get visible text
-        texts = soup.stripped_strings
-        return " ".join(list(texts)[:5000])  # limit length to keep memory sane
-    except Exception:
-        return ""
+def _html_to_text(html: str) -> str:
+    soup = BeautifulSoup(html, "lxml", parse_only=TEXT_STRAINER)
+    # get visible text; islice caps length without materializing everything
+    return " ".join(islice(soup.stripped_strings, 5000))
+
+def _faqs_from_html(html: str):
+    return extract_faqs_from_page(BeautifulSoup(html, "lxml", parse_only=FAQ_STRAINER))
+
+# products.json changes on human timescales; cache it briefly per store
+PRODUCTS_CACHE_TTL = 300
+PRODUCTS_CACHE_MAX = 128
+_PRODUCTS_CACHE: Dict[str, Any] = {}
+
+async def try_products_json(session: aiohttp.ClientSession, base_url: str):
+
+    cached = _PRODUCTS_CACHE.get(base_url)
+    if cached and time.time() - cached[0] < PRODUCTS_CACHE_TTL:
+        return cached[1]
 
-def try_products_json(base_url: str):
-    
     products = []
+    fetched = False
     tried_urls = [
         urljoin(base_url, "/products.json?limit=250"),
         urljoin(base_url, "/products.json"),
     ]
     for url in tried_urls:
         try:
-            r = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            if r.status_code == 200:
-                data = r.json()
-                if isinstance(data, dict) and "products" in data:
-                    products = data["products"]
-                    logger.info(f"Found {len(products)} products at {url}")
-                    break
+            async with session.get(url) as r:
+                if r.status == 200:
+                    # orjson parses the raw bytes directly, skipping the str decode
+                    data = orjson.loads(await r.read())
+                    if isinstance(data, dict) and "products" in data:
+                        products = data["products"]
+                        fetched = True
+                        logger.info(f"Found {len(products)} products at {url}")
+                        break
         except Exception as e:
             logger.debug(f"products.json failed at {url}: {e}")
     # Basic normalization
@@ -145,57 +198,93 @@ def try_products_json(base_url: str):
             "price_max": price_max
         }
         normalized.append(prod)
+    # only cache real fetches; a transient failure shouldn't pin an empty
+    # list on the store for the whole TTL
+    if fetched:
+        if len(_PRODUCTS_CACHE) >= PRODUCTS_CACHE_MAX:
+            _PRODUCTS_CACHE.pop(next(iter(_PRODUCTS_CACHE)))
+        _PRODUCTS_CACHE[base_url] = (time.time(), normalized)
     return normalized
 
-def extract_nav_links(soup: BeautifulSoup, base: str):
-    links = {}
-    for a in soup.find_all("a", href=True):
-        href = a["href"].strip()
-        text = (a.get_text() or "").strip()
-        if not href:
+def _scan_anchors(doc, base: str):
+    # single walk over the links feeding all three consumers; iterlinks is C-level
+    nav_links = {}
+    home_links = set()
+    socials = {}
+    for el, attr, href, _pos in doc.iterlinks():
+        if attr != "href" or el.tag != "a":
             continue
-        if href.startswith("#"):
+        href = href.strip()
+        if not href or href.startswith("#"):
             continue
+        text = el.text_content().strip()
         full = href if href.startswith("http") else urljoin(base, href)
-        links[text or full] = full
-    return links
+        nav_links[text or full] = full
+        if "/products/" in href:
+            home_links.add(full)
+        m = SOCIAL_RE.search(href)
+        if m:
+            socials.setdefault(m.group(1).lower(), full)
+    return nav_links, home_links, socials
+
+def _parse_homepage(page_html: str, base: str):
+    # bytes keep XML encoding declarations legal; empty/garbage bodies just
+    # yield an empty BrandContext like the old BeautifulSoup path did
+    try:
+        doc = lxml.html.fromstring(page_html.encode("utf-8", errors="replace"))
+    except (lxml.etree.ParserError, ValueError) as e:
+        logger.warning(f"Homepage parse failed: {e}")
+        return None, None, {}, set(), {}
+    title = doc.findtext(".//title")
+    title = title.strip() if title else None
+    desc = doc.xpath("//meta[@name='description']/@content") or doc.xpath("//meta[@property='og:description']/@content")
+    description = desc[0].strip() if desc and desc[0] else None
+    nav_links, home_links, socials = _scan_anchors(doc, base)
+    return title, description, nav_links, home_links, socials
 
 def find_policy_pages(links: Dict[str,str]):
     privacy = None
     returns = None
     for key,url in links.items():
         k = key.lower()
-        if "privacy" in k or "privacy" in url.lower():
+        u = url.lower()
+        if "privacy" in k or "privacy" in u:
             privacy = url
-        if "return" in k or "refund" in k or "refund" in url.lower() or "returns" in url.lower():
+        if "return" in k or "refund" in k or "refund" in u or "returns" in u:
             returns = url
     return privacy, returns
 
+def _looks_like_faq(tag):
+    if FAQ_CLASS_RE.search(tag.get("id") or ""):
+        return True
+    return any(FAQ_CLASS_RE.search(c) for c in tag.get("class") or [])
+
 def extract_faqs_from_page(soup: BeautifulSoup):
-   
+
     faqs = []
-   
-    candidates = soup.find_all(attrs={"class": re.compile("faq", re.I)}) + soup.find_all(attrs={"id": re.compile("faq", re.I)})
+
+    # one DOM walk matching class or id against the cached pattern
+    candidates = soup.find_all(_looks_like_faq)
     for cand in candidates:
-      
+
         questions = cand.find_all(['h2','h3','h4','dt','summary'])
         for q in questions:
             q_text = q.get_text(strip=True)
-            
+
             nxt = q.find_next_sibling()
             a_text = ""
             if nxt:
                 a_text = nxt.get_text(" ", strip=True)
             else:
-               
+
                 parent = q.parent
                 if parent:
                     a_text = parent.get_text(" ", strip=True).replace(q_text, "").strip()
             if q_text:
                 faqs.append({"q": q_text, "a": a_text})
-    
+
     if not faqs:
-       
+
         for det in soup.find_all("details"):
             summary = det.find("summary")
             q_text = summary.get_text(strip=True) if summary else ""
@@ -205,129 +294,143 @@ def extract_faqs_from_page(soup: BeautifulSoup):
     return faqs
 
 # --- Core extraction logic ---
-def extract_brand_context(website_url: str) -> BrandContext:
-    website_url = str(website_url) 
+async def extract_brand_context(website_url: str) -> BrandContext:
+    website_url = str(website_url)
     base = normalize_base(website_url)
     logger.info(f"Extracting for {website_url} (base {base})")
 
+    session = get_session()
     #fetch homepage
     try:
-        resp = safe_get(website_url)
+        page_html = await safe_get(session, website_url)
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Website not reachable: {e}")
 
-    soup = BeautifulSoup(resp.text, "lxml")
-    title = soup.title.string.strip() if soup.title else None
-    desc_tag = soup.find("meta", attrs={"name":"description"}) or soup.find("meta", attrs={"property":"og:description"})
-    description = desc_tag["content"].strip() if desc_tag and desc_tag.get("content") else None
-
-    # 2) try products.json
-    products_raw = try_products_json(base)
-    products = [Product(**p) for p in products_raw]
-
-    # 3) hero products
-    home_links = set()
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        if "/products/" in href:
-            # extract handle if possible
-            full = href if href.startswith("http") else urljoin(base, href)
-            home_links.add(full)
-    hero_products = []
-    if home_links:
-        for hl in home_links:
-            found = None
-            for p in products:
-                p_url = str(p.url) if p.url else None
-                if p_url and (p_url.rstrip("/") in hl.rstrip("/") or (p.handle and p.handle in hl)):
-                    found = p
-                    break
-            if not found:
-                handle = hl.split("/products/")[-1].split("?")[0].strip("/")
-                found = Product(title=None, handle=handle, url=hl)
-            hero_products.append(found)
-
+    # parsing a big homepage would otherwise block the event loop
+    title, description, nav_links, home_links, socials = await asyncio.to_thread(
+        _parse_homepage, page_html, base
+    )
 
-    # 4) nav links 
-    nav_links = extract_nav_links(soup, base)
+    # 3) policy links
     privacy_url, returns_url = find_policy_pages(nav_links)
 
-    # If privacy_url not found, try common paths
+    # If policy urls not found, probe common paths concurrently
+    probes = {}
     if not privacy_url:
-        candidate = urljoin(base, "/policies/privacy-policy")  # common
-        try:
-            r = requests.get(candidate, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            if r.status_code == 200:
-                privacy_url = candidate
-        except:
-            pass
+        probes["privacy"] = urljoin(base, "/policies/privacy-policy")  # common
     if not returns_url:
-        candidate = urljoin(base, "/policies/refund-policy")
-        try:
-            r = requests.get(candidate, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            if r.status_code == 200:
+        probes["returns"] = urljoin(base, "/policies/refund-policy")
+    if probes:
+        oks = await asyncio.gather(*(url_exists(session, u) for u in probes.values()))
+        for (kind, candidate), ok in zip(probes.items(), oks):
+            if ok and kind == "privacy":
+                privacy_url = candidate
+            elif ok and kind == "returns":
                 returns_url = candidate
-        except:
-            pass
 
-    # 5) extract text from privacy and returns pages
-    privacy_text = extract_text_from_url(privacy_url) if privacy_url else None
-    returns_text = extract_text_from_url(returns_url) if returns_url else None
-
-    # 6) socials
-    socials = find_social_links(soup, base)
-
-    # 7) contacts - emails and phones present on homepage + find contact page
-    page_text = resp.text
-    emails, phones = find_emails_phones(page_text)
-    contacts = {"emails": emails, "phones": phones}
-
-    # 8) find contact page and about page text
+    # 4) find contact / about / tracking / blog pages
     contact_url = None
     about_url = None
     tracking_url = None
     blogs = None
     for k,u in nav_links.items():
-        key = (k or "").lower()
-        if "contact" in key or "contact" in u.lower():
+        m = NAV_RE.search(f"{k or ''} {u}")
+        if not m:
+            continue
+        kind = m.lastgroup
+        if kind == "contact":
             contact_url = u
-        if "about" in key or "about" in u.lower():
+        elif kind == "about":
             about_url = u
-        if "track" in key or "order" in key or "tracking" in key:
+        elif kind == "track":
             tracking_url = u
-        if "blog" in key or "/blogs" in u:
+        elif kind == "blog":
             blogs = u
 
-    about_text = extract_text_from_url(about_url) if about_url else None
-    contact_text = extract_text_from_url(contact_url) if contact_url else None
-
-    # add any emails/phones found on contact/about pages
-    for text in [about_text, contact_text]:
-        if text:
-            more_emails, more_phones = find_emails_phones(text)
-            for e in more_emails:
-                if e not in contacts["emails"]:
-                    contacts["emails"].append(e)
-            for p in more_phones:
-                if p not in contacts["phones"]:
-                    contacts["phones"].append(p)
-
-    # 9) FAQs - try nav first then page scanning
-    faqs = []
+    # 5) faq page url from nav
     faq_url = None
     for k,u in nav_links.items():
-        if "faq" in (k or "").lower() or "/faq" in u.lower():
+        k_lower = (k or "").lower()
+        u_lower = u.lower()
+        if "faq" in k_lower or "/faq" in u_lower:
             faq_url = u
             break
-    if faq_url:
+
+    # 6) fetch each wanted page exactly once, concurrently
+    # (nav-discovered urls can coincide, e.g. contact == about or faq == privacy)
+    wanted = {
+        "privacy": privacy_url,
+        "returns": returns_url,
+        "about": about_url,
+        "contact": contact_url,
+        "faq": faq_url,
+    }
+    unique_urls = list({u for u in wanted.values() if u})
+
+    async def _get_or_none(url):
         try:
-            r = safe_get(faq_url)
-            faqs = extract_faqs_from_page(BeautifulSoup(r.text, "lxml"))
+            return await safe_get(session, url)
         except Exception:
-            faqs = []
-    # fallback scan homepage
+            return None
+
+    results = await asyncio.gather(
+        try_products_json(session, base),
+        *(_get_or_none(u) for u in unique_urls),
+        return_exceptions=True,
+    )
+    results = [None if isinstance(r, Exception) else r for r in results]
+    products_raw = results[0] or []
+    pages = dict(zip(unique_urls, results[1:]))
+
+    async def _page_text(url):
+        if not url:
+            return None
+        html = pages.get(url)
+        if not html:
+            return ""
+        return await asyncio.to_thread(_html_to_text, html)
+
+    privacy_text, returns_text, about_text, contact_text = await asyncio.gather(
+        _page_text(privacy_url),
+        _page_text(returns_url),
+        _page_text(about_url),
+        _page_text(contact_url),
+    )
+
+    faqs = []
+    if faq_url and pages.get(faq_url):
+        faqs = await asyncio.to_thread(_faqs_from_html, pages[faq_url])
+
+    # model_construct() skips validation; these dicts were just shaped by try_products_json
+    products = [Product.model_construct(**p) for p in products_raw]
+
+    # 7) hero products
+    hero_products = []
+    if home_links:
+        for hl in home_links:
+            found = None
+            for p in products:
+                p_url = str(p.url) if p.url else None
+                if p_url and (p_url.rstrip("/") in hl.rstrip("/") or (p.handle and p.handle in hl)):
+                    found = p
+                    break
+            if not found:
+                handle = hl.split("/products/")[-1].split("?")[0].strip("/")
+                found = Product(title=None, handle=handle, url=hl)
+            hero_products.append(found)
+
+    # 8) contacts - emails and phones present on homepage + contact/about pages
+    emails, phones = find_emails_phones(page_html)
+    for text in [about_text, contact_text]:
+        if text:
+            more_emails, more_phones = find_emails_phones(text)
+            emails |= more_emails
+            phones |= more_phones
+    contacts = {"emails": list(emails), "phones": list(phones)}
+
+    # 9) FAQs - fallback scan homepage when the faq page gave nothing
     if not faqs:
-        faqs = extract_faqs_from_page(soup)
+        faqs = await asyncio.to_thread(_faqs_from_html, page_html)
 
     # 10) important links
     important = {}
@@ -370,23 +473,28 @@ def extract_brand_context(website_url: str) -> BrandContext:
     return brand
 
 # --- FastAPI app ---
-app = FastAPI(title="Shopify Insights Fetcher - GenAI Dev Intern Demo")
+app = FastAPI(title="Shopify Insights Fetcher - GenAI Dev Intern Demo", default_response_class=ORJSONResponse)
+
+@app.on_event("shutdown")
+async def close_session():
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
 
 class ExtractRequest(BaseModel):
     website_url: HttpUrl
 
 @app.post("/extract", response_model=BrandContext)
-def extract(req: ExtractRequest):
+async def extract(req: ExtractRequest):
     """
     INPUT: { "website_url": "https://examplestore.com" }
     OUTPUT: BrandContext JSON
     Errors: 401 if website not reachable / not found; 500 for other internal errors
     """
     try:
-        brand = extract_brand_context(str(req.website_url)) 
+        brand = await extract_brand_context(str(req.website_url))
         return brand
     except HTTPException as he:
-        
+
         raise he
     except Exception as e:
         logger.exception("Unhandled error")
@@ -396,5 +504,5 @@ def extract(req: ExtractRequest):
 def root():
     return {
         "message": "Shopify Insights Fetcher. POST /extract { website_url }",
-        
+
     }